@@ -1,6 +1,6 @@
 # Based on Default/exec.py
 
-import codecs, collections, html, os, re, shutil, signal, subprocess, sys, threading, time
+import array, bisect, codecs, collections, difflib, glob, gzip, heapq, html, json, os, re, shlex, shutil, signal, subprocess, sys, threading, time
 import sublime, sublime_plugin
 from typing import Any, Dict, Tuple
 
@@ -52,6 +52,155 @@ BG_ANSI = {
 RE_UNKNOWN_ESCAPES = re.compile(r"\x1b[^a-zA-Z]*[a-zA-Z]")
 RE_COLOR_ESCAPES = re.compile(r"\x1b\[((?:;?\d+)*)m")
 
+Error = collections.namedtuple("Error", ["file", "line", "col", "message", "offset"])
+
+class ErrorIndex:
+  """
+  Errors found in output so far, in output order. Fed with text as it's
+  appended to output view, so navigation never has to rescan the view
+  """
+
+  def __init__(self, file_regex = "", line_regex = "", base_dir = ""):
+    self.file_regex = self.compile(file_regex)
+    self.line_regex = self.compile(line_regex)
+    self.base_dir = base_dir or ""
+    self.clear()
+
+  def compile(self, regex):
+    try:
+      return re.compile(regex, re.MULTILINE) if regex else None
+    except re.error as e:
+      print("[ Executor ] Invalid regex %s: %s" % (regex, e))
+      return None
+
+  def clear(self):
+    self.errors = []
+    self.by_file = {}
+    self.current = -1
+    self.pending = ""
+    self.pending_offset = 0
+    self.last_file = None
+
+  def feed(self, text, offset):
+    if not self.file_regex:
+      return
+    if not self.pending:
+      self.pending_offset = offset
+    lines = (self.pending + text).split("\n")
+    self.pending = lines.pop()
+    for line in lines:
+      self.add_line(line, self.pending_offset)
+      self.pending_offset += len(line) + 1
+
+  def add_line(self, text, offset):
+    if m := self.file_regex.search(text):
+      file, line, col, message = (m.groups() + (None,) * 4)[:4]
+      self.last_file = file
+    elif self.line_regex and self.last_file and (m := self.line_regex.search(text)):
+      line, col, message = (m.groups() + (None,) * 3)[:3]
+      file = self.last_file
+    else:
+      return
+    # Loose user regex might capture something else than numbers
+    if not file or not line or not line.isdigit() or (col and not col.isdigit()):
+      return
+    file = os.path.normpath(os.path.join(self.base_dir, file))
+    err = Error(file, int(line), int(col or 1), message or "", offset)
+    self.by_file.setdefault(file, []).append(len(self.errors))
+    self.errors.append(err)
+
+  def step(self, delta):
+    if not self.errors:
+      return None
+    if self.current < 0 and delta < 0:
+      self.current = len(self.errors) - 1
+    else:
+      self.current = (self.current + delta) % len(self.errors)
+    return self.errors[self.current]
+
+class LineIndex:
+  """Offsets of line starts in output view, fed as text is appended"""
+
+  def __init__(self):
+    self.clear()
+
+  def clear(self):
+    self.starts = array.array('q', [0])
+
+  def feed(self, text, offset):
+    pos = text.find("\n")
+    while pos >= 0:
+      self.starts.append(offset + pos + 1)
+      pos = text.find("\n", pos + 1)
+
+  def line_start(self, offset):
+    """Start of the line containing offset"""
+    return self.starts[bisect.bisect_right(self.starts, offset) - 1]
+
+class OutputFilter:
+  """
+  Mirrors lines of output view that match `include` and don't match
+  `exclude` into a separate view. Remembers original offset of each
+  mirrored line to jump back to it
+  """
+
+  SCAN_CHUNK = 2 ** 20
+
+  def __init__(self, view, output_view, include, exclude):
+    self.view = view
+    self.output_view = output_view
+    self.include = re.compile(include) if include else None
+    self.exclude = re.compile(exclude) if exclude else None
+    self.lock = threading.Lock()
+    self.clear()
+
+  def clear(self):
+    self.offsets = array.array('q')
+    self.pending = ""
+    self.end = 0
+
+  def scan(self, lines):
+    """Processes everything already in output view, chunked at line starts"""
+    size = self.output_view.size()
+    while self.end < size:
+      chunk_end = lines.line_start(min(self.end + self.SCAN_CHUNK, size))
+      if chunk_end <= self.end:
+        chunk_end = size
+      self.feed(self.output_view.substr(sublime.Region(self.end, chunk_end)), self.end)
+
+  def feed(self, text, offset):
+    # Skip what was already scanned, fetch what was missed
+    if offset + len(text) <= self.end:
+      return
+    if offset < self.end:
+      text = text[self.end - offset:]
+    elif offset > self.end:
+      text = self.output_view.substr(sublime.Region(self.end, offset)) + text
+    line_offset = self.end - len(self.pending)
+    self.end += len(text)
+    lines = (self.pending + text).split("\n")
+    self.pending = lines.pop()
+    matched = []
+    for line in lines:
+      if (not self.include or self.include.search(line)) and not (self.exclude and self.exclude.search(line)):
+        matched.append(line + "\n")
+        self.offsets.append(line_offset)
+      line_offset += len(line) + 1
+    if matched:
+      self.view.run_command('append', {'characters': "".join(matched), 'force': True, 'scroll_to_end': True})
+
+  def goto(self, row):
+    if 0 <= row < len(self.offsets) and self.output_view.is_valid():
+      region = self.output_view.line(self.offsets[row])
+      self.output_view.sel().clear()
+      self.output_view.sel().add(sublime.Region(region.begin()))
+      self.output_view.show_at_center(region)
+      window = self.view.window()
+      if self.output_view.element() is None:
+        window.focus_view(self.output_view)
+      else:
+        window.run_command("executor_show_panel", {"panel": "output.exec"})
+
 class State:
   def __init__(self):
     self.proc = None
@@ -60,6 +209,10 @@ class State:
     self.recents = []
     self.output_view = None
     self.region_id = 0
+    self.errors = ErrorIndex()
+    self.lines = LineIndex()
+    self.filters = []
+    self.command = None
 
 states = collections.defaultdict(lambda: State())
 
@@ -86,51 +239,93 @@ def glob_to_re(s):
     pattern = pattern + "($|/)"
   return re.compile(pattern)
 
-def find_executables_impl(acc, folder, ignores):
+def find_executables_impl(acc, folder, ignores, walk, head, via_link):
   global find_start
   if time.time() - find_start > 0.2:
     return
-  if os.path.exists(folder):
-    local_ignores = ignores.copy()
-    gitignore = os.path.join(folder, ".gitignore")
-    if os.path.exists(gitignore):
-      with open(gitignore, 'rt') as f:
-        # https://git-scm.com/docs/gitignore
-        for line in f.readlines():
-          line = line.strip()
-          if not line:
-            pass
-          elif line.startswith("#"):
-            pass
-          elif line.startswith("!"):
-            pass # TODO negates the pattern; any matching file excluded by a previous pattern will become included again
-          else:
-            local_ignores.append(glob_to_re(line))
-    for name in os.listdir(folder):
-      path = os.path.join(folder, name)
-      matches = [p.pattern for p in local_ignores if re.search(p, path)]
+  try:
+    stat = os.stat(folder)
+  except OSError:
+    return
+  # Same dir reached through symlink or overlapping project folder
+  if (stat.st_dev, stat.st_ino) in walk["visited"]:
+    return
+  walk["visited"].add((stat.st_dev, stat.st_ino))
+  local_ignores = ignores.copy()
+  gitignore = os.path.join(folder, ".gitignore")
+  if os.path.exists(gitignore):
+    with open(gitignore, 'rt') as f:
+      # https://git-scm.com/docs/gitignore
+      for line in f.readlines():
+        line = line.strip()
+        if not line:
+          pass
+        elif line.startswith("#"):
+          pass
+        elif line.startswith("!"):
+          pass # TODO negates the pattern; any matching file excluded by a previous pattern will become included again
+        else:
+          local_ignores.append(glob_to_re(line))
+  try:
+    entries = sorted(os.scandir(folder), key = lambda entry: entry.name)
+  except OSError:
+    return
+  follow_symlinks = walk["follow_symlinks"]
+  for entry in entries:
+    path = entry.path
+    matches = [p.pattern for p in local_ignores if re.search(p, path)]
+    try:
       if matches:
         # print("Ignoring %s because of %s" % (path, matches))
         pass
-      elif os.path.isfile(path):
+      elif entry.is_file(follow_symlinks = follow_symlinks):
         if os.access(path, os.X_OK):
-          acc.append(path)
-          # print(path)
-      elif os.path.isdir(path):
-        find_executables_impl(acc, path, local_ignores)
+          stat = entry.stat(follow_symlinks = follow_symlinks)
+          link = via_link or entry.is_symlink()
+          # Same file reached through several paths is listed once, preferring real path
+          key = (stat.st_dev, stat.st_ino)
+          if key not in acc or (acc[key][0] and not link):
+            acc[key] = (link, path, head)
+            # print(path)
+      elif entry.is_dir(follow_symlinks = follow_symlinks):
+        if entry.is_symlink():
+          # Walked after all real dirs, so real path claims dir first
+          walk["deferred"].append((path, local_ignores, head))
+        else:
+          find_executables_impl(acc, path, local_ignores, walk, head, via_link)
+    except OSError:
+      pass
 
 def find_executables(window):
   global find_start
   find_start = time.time()
-  results = []
+  settings = sublime.load_settings("Preferences.sublime-settings")
+  walk = {"visited": set(),
+          "deferred": collections.deque(),
+          "follow_symlinks": settings.get("executor_follow_symlinks", True)}
+  executables = {}
   for folder in window.folders():
     head, tail = os.path.split(folder)
-    executables = []
-    find_executables_impl(executables, folder, [re.compile("(^|/)\\.git($|/)")])
-    for e in executables:
-      results.append({"name": e[len(head) + 1:], "cmd": "./" + os.path.basename(e), "cwd": os.path.dirname(e)})
+    find_executables_impl(executables, folder, [re.compile("(^|/)\\.git($|/)")], walk, head, False)
+  while walk["deferred"]:
+    folder, ignores, head = walk["deferred"].popleft()
+    find_executables_impl(executables, folder, ignores, walk, head, True)
+  results = []
+  for _, e, head in executables.values():
+    results.append({"name": e[len(head) + 1:], "cmd": "./" + os.path.basename(e), "cwd": os.path.dirname(e)})
   return results
 
+def goto_error(window, err, flags = 0):
+  window.open_file("%s:%d:%d" % (err.file, err.line, err.col), sublime.ENCODED_POSITION | flags)
+  view = get_state(window).output_view
+  if view and view.is_valid():
+    region = view.line(err.offset)
+    view.sel().clear()
+    view.sel().add(sublime.Region(region.begin()))
+    view.show(region)
+  if err.message:
+    sublime.status_message(err.message)
+
 def run_command(window, cmd, args):
   state = get_state(window)
   if state.proc:
@@ -153,10 +348,180 @@ def set_status(s, view):
     state.status = s
     refresh_status(view)
 
+def archive_dir():
+  return os.path.join(sublime.cache_path(), "Executor", "runs")
+
+class ArchivedRun:
+  """
+  Streams output of a single run into <id>.log.gz and, once finished,
+  writes metadata to <id>.json next to it
+  """
+
+  def __init__(self, name, cmd, cwd):
+    os.makedirs(archive_dir(), exist_ok = True)
+    self.id = "%d" % time.time_ns()
+    self.meta = {"id": self.id, "name": name, "cmd": cmd, "cwd": cwd, "start": time.time()}
+    self.file = gzip.open(os.path.join(archive_dir(), self.id + ".log.gz"), "wb", compresslevel = 6)
+    self.lock = threading.Lock()
+
+  def write(self, data):
+    with self.lock:
+      if self.file:
+        try:
+          self.file.write(data.encode("utf-8"))
+        except OSError as e:
+          # Runs on reader thread, output must keep flowing
+          print("[ Executor ] Can't archive run: " + str(e))
+          try:
+            self.file.close()
+          except OSError:
+            pass
+          self.file = None
+
+  def finish(self, status, exit_code):
+    with self.lock:
+      if not self.file:
+        return
+      self.file.close()
+      self.file = None
+    self.meta["end"] = time.time()
+    self.meta["elapsed"] = self.meta["end"] - self.meta["start"]
+    self.meta["status"] = status
+    self.meta["exit_code"] = exit_code
+    with open(os.path.join(archive_dir(), self.id + ".json"), "wt") as f:
+      json.dump(self.meta, f)
+
+def archived_runs():
+  """Metadata of all finished runs, most recent first"""
+  runs = []
+  dir = archive_dir()
+  if os.path.isdir(dir):
+    for name in os.listdir(dir):
+      if name.endswith(".json") and os.path.exists(os.path.join(dir, name[:-len(".json")] + ".log.gz")):
+        try:
+          with open(os.path.join(dir, name), "rt") as f:
+            runs.append(json.load(f))
+        except (OSError, ValueError):
+          pass
+  runs.sort(key = lambda run: run["start"], reverse = True)
+  return runs
+
+def touch_archived_run(run):
+  try:
+    os.utime(os.path.join(archive_dir(), run["id"] + ".json"))
+  except OSError:
+    pass
+
+# Runs without metadata are in progress, unless log wasn't touched for this long
+ARCHIVE_STALE = 24 * 60 * 60
+
+def evict_archived_runs(limit, keep = None):
+  """Deletes least recently used runs until archive fits into `limit` bytes"""
+  dir = archive_dir()
+  if not os.path.isdir(dir):
+    return
+  runs = {}
+  for name in os.listdir(dir):
+    id = name.split(".", 1)[0]
+    try:
+      stat = os.stat(os.path.join(dir, name))
+    except OSError:
+      continue
+    size, last_used, finished = runs.get(id, (0, 0, False))
+    if name.endswith(".json"):
+      runs[id] = (size + stat.st_size, stat.st_mtime, True)
+    else:
+      runs[id] = (size + stat.st_size, last_used if finished else stat.st_mtime, finished)
+  total = sum(size for size, _, _ in runs.values())
+  now = time.time()
+  for id, (size, last_used, finished) in sorted(runs.items(), key = lambda item: item[1][1]):
+    if total <= limit:
+      break
+    if id == keep or (not finished and now - last_used < ARCHIVE_STALE):
+      continue
+    for ext in (".json", ".log.gz"):
+      try:
+        os.remove(os.path.join(dir, id + ext))
+      except OSError:
+        pass
+    total -= size
+
+def read_archived_lines(run):
+  try:
+    f = gzip.open(os.path.join(archive_dir(), run["id"] + ".log.gz"), "rt", encoding = "utf-8", errors = "replace", newline = "")
+  except FileNotFoundError:
+    return
+  with f:
+    yield from f
+
+def format_diff_range(start, length):
+  if length == 1:
+    return "%d" % (start + 1)
+  if length == 0:
+    return "%d,0" % start
+  return "%d,%d" % (start + 1, length)
+
+def diff_archived_runs(old, new, context = 3):
+  """
+  Yields unified diff lines between two archived runs. Only line hashes
+  are kept in memory, text is streamed again from the compressed logs
+  """
+  a = [hash(line) for line in read_archived_lines(old)]
+  b = [hash(line) for line in read_archived_lines(new)]
+  old_lines = read_archived_lines(old)
+  new_lines = read_archived_lines(new)
+  old_pos = 0
+  new_pos = 0
+
+  def take(lines, pos, start, end):
+    for _ in range(pos, start):
+      next(lines)
+    for _ in range(start, end):
+      line = next(lines)
+      yield line if line.endswith("\n") else line + "\n"
+
+  yield "--- %s\t%s\n" % (old["name"], time.ctime(old["start"]))
+  yield "+++ %s\t%s\n" % (new["name"], time.ctime(new["start"]))
+  matcher = difflib.SequenceMatcher(None, a, b)
+  for group in matcher.get_grouped_opcodes(context):
+    i1, j1 = group[0][1], group[0][3]
+    i2, j2 = group[-1][2], group[-1][4]
+    yield "@@ -%s +%s @@\n" % (format_diff_range(i1, i2 - i1), format_diff_range(j1, j2 - j1))
+    for tag, i1, i2, j1, j2 in group:
+      if tag == "equal":
+        for line in take(old_lines, old_pos, i1, i2):
+          yield " " + line
+        for _ in take(new_lines, new_pos, j1, j2):
+          pass
+      else:
+        for line in take(old_lines, old_pos, i1, i2):
+          yield "-" + line
+        for line in take(new_lines, new_pos, j1, j2):
+          yield "+" + line
+      old_pos, new_pos = i2, j2
+
 class ExecutorEventListener(sublime_plugin.EventListener):
+  def on_activated(self, view):
+    self.annotate(view)
+
+  def on_load(self, view):
+    self.annotate(view)
+
+  def annotate(self, view):
+    if (window := view.window()) and view.file_name():
+      command = get_state(window).command
+      if command and command.show_errors_inline:
+        command.annotate_view(view)
+
   def on_activated_async(self, view):
     refresh_status(view)
 
+  def on_post_text_command(self, view, command_name, args):
+    if command_name == "drag_select" and view.settings().get("executor_filter") and (window := view.window()):
+      for filter in get_state(window).filters:
+        if filter.view == view and len(view.sel()) == 1:
+          filter.goto(view.rowcol(view.sel()[0].b)[0])
+
   def on_pre_close_window(self, window):
     state = get_state(window)
     if state.proc:
@@ -187,6 +552,133 @@ class SelectExecutableInputHandler(sublime_plugin.ListInputHandler):
   def next_input(self, args):
     return ArgsInputHandler() if self.args else None
 
+def format_elapsed(elapsed):
+  if elapsed < 1:
+    return "%.0fms" % (elapsed * 1000)
+  else:
+    return "%.1fs" % (elapsed)
+
+class Timeline:
+  """
+  Assigns arrival time to every output line and keeps largest gaps
+  between lines and phases started by lines matching regex
+  """
+
+  # Don't put more than one timestamp per 100ms of output
+  RESOLUTION = 0.1
+  GAPS = 5
+
+  def __init__(self, start, phase_regex = ""):
+    self.start = start
+    try:
+      self.phase_regex = re.compile(phase_regex) if phase_regex else None
+    except re.error as e:
+      print("[ Executor ] Invalid regex %s: %s" % (phase_regex, e))
+      self.phase_regex = None
+    self.lines = 0
+    self.gaps = []
+    self.phases = []
+    self.pending = ""
+    self.pending_offset = 0
+    self.last = start
+    self.last_stamp = None
+
+  def feed(self, text, offset, t):
+    """Returns (offset, elapsed) for line starts that should display timestamp"""
+    stamps = []
+    if not self.pending:
+      self.pending_offset = offset
+    lines = (self.pending + text).split("\n")
+    self.pending = lines.pop()
+    for line in lines:
+      self.lines += 1
+      line_no = self.lines
+      # Lines arriving in the same chunk aren't stalls
+      if t - self.last >= self.RESOLUTION:
+        heapq.heappush(self.gaps, (t - self.last, line_no, line[:100]))
+        if len(self.gaps) > self.GAPS:
+          heapq.heappop(self.gaps)
+      if self.phase_regex and (m := self.phase_regex.search(line)):
+        self.phases.append((m.group(1) if m.groups() else m.group(0), t))
+      if self.last_stamp is None or t - self.last_stamp >= self.RESOLUTION:
+        stamps.append((self.pending_offset, t - self.start))
+        self.last_stamp = t
+      self.last = t
+      self.pending_offset += len(line) + 1
+    return stamps
+
+  def summary(self, end):
+    lines = ["[ TIMELINE ] %d lines in %s\n" % (self.lines, format_elapsed(end - self.start))]
+    for i, (name, t) in enumerate(self.phases):
+      phase_end = self.phases[i + 1][1] if i + 1 < len(self.phases) else end
+      lines.append("  %8s  %s\n" % (format_elapsed(phase_end - t), name))
+    for gap, line_no, text in sorted(self.gaps, reverse = True):
+      lines.append("  %8s  before line %d: %s\n" % (format_elapsed(gap), line_no, text))
+    return lines
+
+def format_size(size):
+  if size < 2 ** 20:
+    return "%.0fKB" % (size / 2 ** 10)
+  elif size < 2 ** 30:
+    return "%.0fMB" % (size / 2 ** 20)
+  else:
+    return "%.1fGB" % (size / 2 ** 30)
+
+ProcessStats = collections.namedtuple("ProcessStats", ["cpu", "rss", "threads", "children"])
+
+class ProcessMonitor:
+  """
+  Samples CPU, RSS, threads and children of process groups from /proc.
+  Relies on AsyncProcess starting processes with os.setsid, so pgid == pid
+  """
+
+  def __init__(self, pgids):
+    self.pgids = set(pgids)
+    self.ticks = {}
+    self.time = time.monotonic()
+    self.peak = ProcessStats(0, 0, 0, 0)
+    self.clock_ticks = os.sysconf("SC_CLK_TCK")
+    self.page_size = os.sysconf("SC_PAGE_SIZE")
+
+  @staticmethod
+  def is_supported():
+    return sys.platform == "linux" and os.path.isdir("/proc")
+
+  def sample(self):
+    ticks = {}
+    cpu_ticks = 0
+    rss = 0
+    threads = 0
+    for pid in os.listdir("/proc"):
+      if not pid.isdigit():
+        continue
+      try:
+        with open("/proc/%s/stat" % pid, "rb") as f:
+          stat = f.read()
+      except OSError:
+        continue
+      # comm can contain spaces and parens, fields start after the last ')'
+      fields = stat[stat.rfind(b")") + 2:].split()
+      if int(fields[2]) not in self.pgids:
+        continue
+      ticks[pid] = int(fields[11]) + int(fields[12])
+      cpu_ticks += ticks[pid] - self.ticks.get(pid, 0)
+      threads += int(fields[17])
+      rss += int(fields[21]) * self.page_size
+    now = time.monotonic()
+    if not ticks:
+      return None
+    cpu = cpu_ticks / self.clock_ticks / max(now - self.time, 0.001) * 100
+    self.ticks = ticks
+    self.time = now
+    stats = ProcessStats(cpu, rss, threads, max(len(ticks) - len(self.pgids), 0))
+    self.peak = ProcessStats(*(max(a, b) for a, b in zip(self.peak, stats)))
+    return stats
+
+  @staticmethod
+  def format(stats):
+    return "CPU %.0f%% RSS %s %d threads %d children" % (stats.cpu, format_size(stats.rss), stats.threads, stats.children)
+
 class ProcessListener:
     def on_data(self, proc, data):
         pass
@@ -201,6 +693,9 @@ class AsyncProcess:
     ProcessListener (on a separate thread)
     """
 
+    READ_MIN = 2 ** 12
+    READ_MAX = 2 ** 20
+
     def __init__(self, cmd, shell_cmd, env, listener, path="", shell=False):
         """ "path" and "shell" are options in build systems """
 
@@ -213,8 +708,12 @@ class AsyncProcess:
         self.shell_cmd = shell_cmd
         self.listener = listener
         self.killed = False
+        self.archive = None
+        self.timeline = None
+        self.monitor = None
 
         self.start_time = time.time()
+        self.read_time = time.monotonic()
 
         # Hide the console window on Windows
         startupinfo = None
@@ -309,21 +808,184 @@ class AsyncProcess:
     def exit_code(self):
         return self.proc.poll()
 
+    def pids(self):
+        return [self.proc.pid]
+
     def read_fileno(self, file, execute_finished):
-        decoder = \
-            codecs.getincrementaldecoder(self.listener.encoding)('replace')
+        if codecs.lookup(self.listener.encoding).name == "utf-8":
+            # Decodes straight from memoryview and reports how many bytes it
+            # consumed, leaving incomplete sequence at the end for next read
+            decode = codecs.utf_8_decode
+        else:
+            decoder = \
+                codecs.getincrementaldecoder(self.listener.encoding)('replace')
+            # Incremental decoder buffers incomplete sequences itself
+            def decode(data, errors, final):
+                return decoder.decode(data, final), len(data)
+        # Lines can only be framed at byte level if encoding keeps "\n" a single byte
+        framed = "\n".encode(self.listener.encoding) == b"\n"
+
+        # Bytes not yet decoded are kept at the start of buf. Leftover after
+        # decoding is copied to the start of spare buffer, then they swap
+        buf, spare = bytearray(self.READ_MAX * 2), bytearray(self.READ_MAX * 2)
+        view, spare_view = memoryview(buf), memoryview(spare)
+        start = 0
+        size = self.READ_MIN
+
+        # Trailing "\r" is passed on right away (progress output), and "\n"
+        # starting next chunk is dropped if it turns out to be "\r\n"
+        pending_cr = False
+        def normalize(data):
+            nonlocal pending_cr
+            if data:
+                if pending_cr and data[0] == '\n':
+                    data = data[1:]
+                pending_cr = data.endswith('\r')
+            if '\r' in data:
+                data = data.replace('\r\n', '\n').replace('\r', '\n')
+            return data
 
         while True:
-            data = decoder.decode(file.read(2**16))
-            data = data.replace('\r\n', '\n').replace('\r', '\n')
-
-            if len(data) > 0 and not self.killed:
-                self.listener.on_data(self, data)
-            else:
+            read = file.readinto(view[start:start + size])
+            self.read_time = time.monotonic()
+
+            if not read or self.killed:
+                data, _ = decode(view[:start], 'replace', True)
+                data = normalize(data)
+                if data and not self.killed:
+                    self.listener.on_data(self, data)
                 if execute_finished:
                     self.listener.on_finished(self)
                 break
 
+            end = start + read
+            cut = end
+            # Full read means more is waiting, hand over complete lines only
+            if framed and read == size:
+                cut = buf.rfind(b"\n", 0, end) + 1 or end
+
+            data, consumed = decode(view[:cut], 'replace', False)
+            start = end - consumed
+            spare_view[:start] = view[consumed:end]
+            buf, spare = spare, buf
+            view, spare_view = spare_view, view
+
+            # Grow reads for firehose output, shrink for trickling one
+            if read == size and size < self.READ_MAX:
+                size *= 2
+            elif read < size // 4 and size > self.READ_MIN:
+                size //= 2
+
+            data = normalize(data)
+            if data:
+                self.listener.on_data(self, data)
+
+def shard_commands(cmd, args, cwd, shards):
+  """Expands globs in args and splits them round-robin into `shards` commands, each starting with cmd"""
+  expanded = []
+  for arg in shlex.split(args):
+    if any(c in arg for c in "*?["):
+      matches = sorted(glob.glob(os.path.join(cwd or "", arg), recursive = True))
+      if matches:
+        expanded += [m if os.path.isabs(arg) else os.path.relpath(m, cwd or ".") for m in matches]
+        continue
+    expanded.append(arg)
+  shards = max(1, min(shards, len(expanded)))
+  return [" ".join([cmd] + [shlex.quote(arg) for arg in expanded[i::shards]]) for i in range(shards)]
+
+class ShardListener(ProcessListener):
+  """Prefixes complete lines of one shard with its number"""
+
+  def __init__(self, parent, index):
+    self.parent = parent
+    self.index = index
+    self.prefix = "[%d] " % (index + 1)
+    self.encoding = parent.listener.encoding
+    self.pending = ""
+
+  def on_data(self, proc, data):
+    lines = (self.pending + data).split("\n")
+    self.pending = lines.pop()
+    if lines:
+      self.parent.on_shard_data(proc, "".join(self.prefix + line + "\n" for line in lines))
+
+  def on_finished(self, proc):
+    if self.pending:
+      self.parent.on_shard_data(proc, self.prefix + self.pending + "\n")
+      self.pending = ""
+    self.parent.on_shard_finished(self, proc)
+
+class ShardedProcess:
+    """
+    Runs several commands concurrently as AsyncProcess and reports them
+    to a supplied ProcessListener as a single process
+    """
+
+    def __init__(self, shell_cmds, env, listener, **kwargs):
+        self.shell_cmd = "%d shards of %s" % (len(shell_cmds), shell_cmds[0])
+        self.listener = listener
+        self.killed = False
+        self.archive = None
+        self.timeline = None
+        self.monitor = None
+        self.start_time = time.time()
+        self.read_time = time.monotonic()
+        self.lock = threading.Lock()
+        self.results = [None] * len(shell_cmds)
+        self.procs = []
+        try:
+            for i, shell_cmd in enumerate(shell_cmds):
+                self.procs.append(AsyncProcess(None, shell_cmd, env, ShardListener(self, i), **kwargs))
+        except Exception:
+            self.kill()
+            raise
+
+    def start(self):
+        for proc in self.procs:
+            proc.start()
+
+    def kill(self):
+        self.killed = True
+        for proc in self.procs:
+            if proc.poll():
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+
+    def poll(self):
+        return any(proc.poll() for proc in self.procs)
+
+    def exit_code(self):
+        codes = [proc.exit_code() for proc in self.procs]
+        return next((code for code in codes if code), 0)
+
+    def pids(self):
+        return [proc.proc.pid for proc in self.procs]
+
+    def on_shard_data(self, proc, data):
+        with self.lock:
+            self.read_time = proc.read_time
+            if not self.killed:
+                self.listener.on_data(self, data)
+
+    def on_shard_finished(self, shard, proc):
+        with self.lock:
+            self.results[shard.index] = (proc.exit_code(), time.time() - proc.start_time)
+            if None in self.results:
+                return
+            if not self.killed:
+                summary = ""
+                for i, (exit_code, elapsed) in enumerate(self.results):
+                    if exit_code:
+                        summary += "[ SHARD %d ] FAIL with code %d in %s\n" % (i + 1, exit_code, format_elapsed(elapsed))
+                    else:
+                        summary += "[ SHARD %d ] DONE in %s\n" % (i + 1, format_elapsed(elapsed))
+                passed = sum(1 for exit_code, _ in self.results if not exit_code)
+                summary += "[ SHARDS ] %d of %d passed\n" % (passed, len(self.results))
+                self.listener.on_data(self, summary)
+        self.listener.on_finished(self)
+
 class CommandInputHandler(sublime_plugin.TextInputHandler):
   def placeholder(self):
     return 'Shell command to run'
@@ -348,14 +1010,46 @@ class ExecutorExecuteShellCommand(sublime_plugin.WindowCommand):
         if "command" not in args:
             return CommandInputHandler()
 
+ANNOTATION_STYLESHEET = '''
+    <style>
+        #annotation-error {
+            background-color: color(var(--background) blend(#fff 95%));
+        }
+        html.dark #annotation-error {
+            background-color: color(var(--background) blend(#fff 95%));
+        }
+        html.light #annotation-error {
+            background-color: color(var(--background) blend(#000 85%));
+        }
+        a {
+            text-decoration: inherit;
+        }
+    </style>
+'''
+
+TIMESTAMP_HTML = '''
+    <body id="executor-timestamp">
+        <style>
+            span {
+                color: color(var(--foreground) alpha(0.5));
+                font-size: 0.9em;
+            }
+        </style>
+        <span>%s </span>
+    </body>
+'''
+
 class ExecutorImplCommand(sublime_plugin.WindowCommand, ProcessListener):
     OUTPUT_LIMIT = 2 ** 27
+    MONITOR_INTERVAL = 1000
 
     def __init__(self, window):
         super().__init__(window)
-        self.errs_by_file = {}
-        self.annotation_sets_by_buffer = {}
+        self.annotated_views = {}
+        self.annotation_html = {}
         self.show_errors_inline = True
+        # Guards status and title against monitor updates after finish
+        self.status_lock = threading.Lock()
 
     def settings(self):
         return sublime.load_settings("Preferences.sublime-settings")
@@ -421,6 +1115,8 @@ class ExecutorImplCommand(sublime_plugin.WindowCommand, ProcessListener):
             update_annotations_only=False,
             word_wrap=None,
             syntax="Packages/Text/Plain text.tmLanguage",
+            shards=0,
+            shard_args="",
             # Catches "path" and "shell"
             **kwargs):
 
@@ -436,13 +1132,24 @@ class ExecutorImplCommand(sublime_plugin.WindowCommand, ProcessListener):
             state.proc.kill()
 
         name = select_executable["name"] + (" " + args if args else "")
-        self.name = name
         shell_cmd = select_executable["cmd"] + (" " + args if args else "")
-        self.shell_cmd = shell_cmd
         working_dir = select_executable.get("cwd")
         cmd = {"name": name,
                "cmd": shell_cmd,
                "cwd": working_dir}
+        # Sharded runs keep list to split separately so it can be split again on repeat
+        if "shards" in select_executable:
+            shards = select_executable["shards"]
+            shard_args = select_executable["shard_args"]
+        elif shards and shard_args:
+            name += " " + shard_args
+            cmd["name"] = name
+        if shards:
+            cmd.update({"shard_args": shard_args, "shards": shards})
+            shard_cmd = shell_cmd
+            shell_cmd += " " + shard_args if shard_args else ""
+        self.name = name
+        self.shell_cmd = shell_cmd
         if cmd in state.recents:
           state.recents.remove(cmd)
         state.recents.insert(0, cmd)
@@ -471,6 +1178,7 @@ class ExecutorImplCommand(sublime_plugin.WindowCommand, ProcessListener):
         state.output_view = self.get_output_view()
         state.output_view.run_command("executor_clear_output_impl")
         self.init_output_view(state.output_view)
+        state.errors = ErrorIndex(self.file_regex, self.line_regex, self.working_dir)
 
         self.encoding = encoding
         self.quiet = quiet
@@ -512,23 +1220,51 @@ class ExecutorImplCommand(sublime_plugin.WindowCommand, ProcessListener):
         self.output_size = 0
         self.should_update_annotations = False
 
-        self.write("[ RUN ] \"%s\" in %s\n" % (shell_cmd, working_dir))
+        archive = None
+        if settings.get("executor_archive_runs", True):
+            try:
+                archive = ArchivedRun(name, shell_cmd, working_dir)
+            except OSError as e:
+                print("[ Executor ] Can't archive run: " + str(e))
+
+        if shards:
+            shard_cmds = shard_commands(shard_cmd, shard_args, working_dir, shards)
+            self.write("[ RUN ] \"%s\" in %s, %d shards\n" % (shell_cmd, working_dir, len(shard_cmds)))
+        else:
+            self.write("[ RUN ] \"%s\" in %s\n" % (shell_cmd, working_dir))
         max_len = 50
         cmd_name = cmd["name"] if len(cmd["name"]) <= max_len + 3 else cmd["name"][:max_len] + "..."
+        self.status_name = cmd_name
         set_status("▶️ " + cmd_name, self.window.active_view())
 
+        timeline = None
+        if settings.get("executor_timestamps", False):
+            timeline = Timeline(time.monotonic(), settings.get("executor_phase_regex", ""))
+
         try:
             # Forward kwargs to AsyncProcess
-            state.proc = AsyncProcess(cmd, shell_cmd, merged_env, self, **kwargs)
-            state.proc.start()
+            if shards:
+                proc = ShardedProcess(shard_cmds, merged_env, self, **kwargs)
+            else:
+                proc = AsyncProcess(cmd, shell_cmd, merged_env, self, **kwargs)
+            # Kept on process, so a killed run finishing late doesn't touch the new one
+            proc.archive = archive
+            proc.timeline = timeline
+            if settings.get("executor_monitor", True) and ProcessMonitor.is_supported():
+                proc.monitor = ProcessMonitor(proc.pids())
+            state.proc = proc
+            proc.start()
+
+            if monitor := proc.monitor:
+                sublime.set_timeout_async(lambda: self.sample(proc, monitor), self.MONITOR_INTERVAL)
 
         except Exception as e:
             self.write(str(e) + "\n")
             if not self.quiet:
                 self.write("[ EXCEPTION ]\n")
-            set_status(None, window.active_view())
+            set_status(None, self.window.active_view())
 
-    def write(self, characters):
+    def write(self, characters, proc = None):
         if self.window.active_view().settings().get("executor_show_panel_on_output", False):
             self.window.run_command("executor_show_panel", {"panel": "output.exec"})
 
@@ -571,6 +1307,21 @@ class ExecutorImplCommand(sublime_plugin.WindowCommand, ProcessListener):
 
         insertion_point = view.size()
         view.run_command('append', {'characters': decolorized, 'force': True, 'scroll_to_end': True})
+        state.errors.feed(decolorized, insertion_point)
+        state.lines.feed(decolorized, insertion_point)
+        for filter in list(state.filters):
+            if filter.view.is_valid():
+                with filter.lock:
+                    filter.feed(decolorized, insertion_point)
+            else:
+                state.filters.remove(filter)
+
+        if proc and proc.timeline:
+            for offset, elapsed in proc.timeline.feed(decolorized, insertion_point, proc.read_time):
+                view.add_phantom("executor_timestamp",
+                                 sublime.Region(offset),
+                                 TIMESTAMP_HTML % format_elapsed(elapsed),
+                                 sublime.LAYOUT_INLINE)
         
         for region in regions:
             fg = region['fg']
@@ -583,14 +1334,6 @@ class ExecutorImplCommand(sublime_plugin.WindowCommand, ProcessListener):
 
         # Updating annotations is expensive, so batch it to the main thread
         def annotations_check():
-            errs = self.get_output_view().find_all_results_with_text()
-            errs_by_file = {}
-            for file, line, column, text in errs:
-                if file not in errs_by_file:
-                    errs_by_file[file] = []
-                errs_by_file[file].append((line, column, text))
-            self.errs_by_file = errs_by_file
-
             self.update_annotations()
 
             self.should_update_annotations = False
@@ -600,31 +1343,36 @@ class ExecutorImplCommand(sublime_plugin.WindowCommand, ProcessListener):
                 self.should_update_annotations = True
                 sublime.set_timeout(lambda: annotations_check())
 
-    def on_data(self, _proc, data):
+        return decolorized
+
+    def on_data(self, proc, data):
         # Truncate past the limit
         if self.output_size >= self.OUTPUT_LIMIT:
             return
 
-        self.write(data)
+        decolorized = self.write(data, proc)
         self.output_size += len(data)
+        if proc.archive:
+            proc.archive.write(decolorized)
 
         if self.output_size >= self.OUTPUT_LIMIT:
             self.write('[Output Truncated]\n')
 
     def on_finished(self, proc):
         status = None
+        exit_code = proc.exit_code()
         print("[ Executor ] Finished " + proc.shell_cmd)
+        if proc.timeline:
+            for line in proc.timeline.summary(time.monotonic()):
+                self.write(line)
         if proc.killed:
             status = "CANCEL"
             self.write("[ CANCEL ]\n")
         elif not self.quiet:
-            elapsed = time.time() - proc.start_time
-            if elapsed < 1:
-                elapsed_str = "%.0fms" % (elapsed * 1000)
-            else:
-                elapsed_str = "%.1fs" % (elapsed)
+            elapsed_str = format_elapsed(time.time() - proc.start_time)
+            if proc.monitor and proc.monitor.ticks:
+                elapsed_str += ", peak " + ProcessMonitor.format(proc.monitor.peak)
 
-            exit_code = proc.exit_code()
             if exit_code == 0 or exit_code is None:
                 status = "DONE"
                 self.write("[ DONE ] in %s\n" % elapsed_str)
@@ -632,96 +1380,125 @@ class ExecutorImplCommand(sublime_plugin.WindowCommand, ProcessListener):
                 status = "FAIL"
                 self.write("[ FAIL ] with code %d in %s\n" % (exit_code, elapsed_str))
 
+        if archive := proc.archive:
+            proc.archive = None
+            try:
+                archive.finish(status, exit_code)
+                limit = self.settings().get("executor_archive_limit_mb", 100) * 2 ** 20
+                evict_archived_runs(limit, keep = archive.id)
+            except OSError as e:
+                print("[ Executor ] Can't archive run: " + str(e))
+
         if not self.window.is_valid():
           del states[self.window.id()]
         else:
-          set_status(None, self.window.active_view())
           state = get_state(self.window)
-          state.proc = None
-          if self.use_output_view():
-            self.get_output_view().set_name("[ %s ] %s" % (status, self.name))
+          with self.status_lock:
+            # With kill_previous, new run might already be running
+            if state.proc is proc:
+              set_status(None, self.window.active_view())
+              state.proc = None
+              if self.use_output_view():
+                self.get_output_view().set_name("[ %s ] %s" % (status, self.name))
           if cmd := state.next_cmd:
             (cmd, args) = cmd
             state.next_cmd = None
             self.window.run_command(cmd, args)
 
+    def sample(self, proc, monitor):
+        if not self.window.is_valid() or get_state(self.window).proc is not proc or not proc.poll():
+            return
+        if stats := monitor.sample():
+            stats_str = ProcessMonitor.format(stats)
+            with self.status_lock:
+                # on_finished might have run while sampling
+                if get_state(self.window).proc is not proc:
+                    return
+                set_status("▶️ %s  %s" % (self.status_name, stats_str), self.window.active_view())
+                if self.use_output_view():
+                    self.get_output_view().set_name("▶️ [ RUN ] %s  %s" % (self.name, stats_str))
+        sublime.set_timeout_async(lambda: self.sample(proc, monitor), self.MONITOR_INTERVAL)
+
     def update_annotations(self):
-        stylesheet = '''
-            <style>
-                #annotation-error {
-                    background-color: color(var(--background) blend(#fff 95%));
-                }
-                html.dark #annotation-error {
-                    background-color: color(var(--background) blend(#fff 95%));
-                }
-                html.light #annotation-error {
-                    background-color: color(var(--background) blend(#000 85%));
-                }
-                a {
-                    text-decoration: inherit;
-                }
-            </style>
-        '''
-
-        for file, errs in self.errs_by_file.items():
-            view = self.window.find_open_file(file)
-            if view:
-                selection_set = []
-                content_set = []
-
-                line_err_set = []
-
-                for line, column, text in errs:
-                    pt = view.text_point(line - 1, column - 1)
-                    if (line_err_set and
-                            line == line_err_set[len(line_err_set) - 1][0]):
-                        line_err_set[len(line_err_set) - 1][1] += (
-                            "<br>" + html.escape(text, quote=False))
-                    else:
-                        pt_b = pt + 1
-                        if view.classify(pt) & sublime.CLASS_WORD_START:
-                            pt_b = view.find_by_class(
-                                pt,
-                                forward=True,
-                                classes=(sublime.CLASS_WORD_END))
-                        if pt_b <= pt:
-                            pt_b = pt + 1
-                        selection_set.append(
-                            sublime.Region(pt, pt_b))
-                        line_err_set.append(
-                            [line, html.escape(text, quote=False)])
-
-                for text in line_err_set:
-                    content_set.append(
-                        '<body>' + stylesheet +
-                        '<div class="error" id=annotation-error>' +
-                        '<span class="content">' + text[1] + '</span></div>' +
-                        '</body>')
-
-                view.add_regions(
-                    "exec",
-                    selection_set,
-                    scope="invalid",
-                    annotations=content_set,
-                    flags=(sublime.DRAW_SQUIGGLY_UNDERLINE |
-                           sublime.DRAW_NO_FILL | sublime.DRAW_NO_OUTLINE),
-                    on_close=self.hide_annotations)
+        # Only visible views are annotated, the rest is done in on_activated
+        for group in range(self.window.num_groups()):
+            view = self.window.active_view_in_group(group)
+            if view and view.file_name():
+                self.annotate_view(view)
+
+    def annotate_view(self, view):
+        # Text points are meaningless until file is loaded, on_load will retry
+        if view.is_loading():
+            return
+        errors = get_state(self.window).errors
+        indices = errors.by_file.get(os.path.normpath(view.file_name()))
+        if not indices:
+            return
+        annotated = self.annotated_views.get(view.id())
+        if annotated and annotated[1] == len(indices):
+            return
+        self.annotated_views[view.id()] = (view, len(indices))
+
+        limit = self.settings().get("executor_annotations_per_file", 100)
+        selection_set = []
+        content_set = []
+
+        line_err_set = []
+
+        for i in indices:
+            err = errors.errors[i]
+            text = self.annotation_html.get(i)
+            if text is None:
+                text = html.escape(err.message, quote=False)
+                self.annotation_html[i] = text
+            if (line_err_set and
+                    err.line == line_err_set[len(line_err_set) - 1][0]):
+                line_err_set[len(line_err_set) - 1][1].append(text)
+            elif len(line_err_set) >= limit:
+                break
+            else:
+                pt = view.text_point(err.line - 1, err.col - 1)
+                pt_b = pt + 1
+                if view.classify(pt) & sublime.CLASS_WORD_START:
+                    pt_b = view.find_by_class(
+                        pt,
+                        forward=True,
+                        classes=(sublime.CLASS_WORD_END))
+                if pt_b <= pt:
+                    pt_b = pt + 1
+                selection_set.append(
+                    sublime.Region(pt, pt_b))
+                line_err_set.append([err.line, [text]])
+
+        for line, texts in line_err_set:
+            content_set.append(
+                '<body>' + ANNOTATION_STYLESHEET +
+                '<div class="error" id=annotation-error>' +
+                '<span class="content">' + "<br>".join(texts) + '</span></div>' +
+                '</body>')
+
+        view.add_regions(
+            "exec",
+            selection_set,
+            scope="invalid",
+            annotations=content_set,
+            flags=(sublime.DRAW_SQUIGGLY_UNDERLINE |
+                   sublime.DRAW_NO_FILL | sublime.DRAW_NO_OUTLINE),
+            on_close=self.hide_annotations)
 
     def hide_annotations(self):
-        for window in sublime.windows():
-            for file, errs in self.errs_by_file.items():
-                view = window.find_open_file(file)
-                if view:
-                    view.erase_regions("exec")
-                    view.hide_popup()
+        for view, _ in self.annotated_views.values():
+            if view.is_valid():
+                view.erase_regions("exec")
+                view.hide_popup()
 
         view = sublime.active_window().active_view()
         if view:
             view.erase_regions("exec")
             view.hide_popup()
 
-        self.errs_by_file = {}
-        self.annotation_sets_by_buffer = {}
+        self.annotated_views = {}
+        self.annotation_html = {}
         self.show_errors_inline = False
 
 class ExecutorExecuteWithArgsCommand(sublime_plugin.WindowCommand):
@@ -740,6 +1517,40 @@ class ExecutorExecuteCommand(sublime_plugin.WindowCommand):
   def input(self, args):
     return SelectExecutableInputHandler(self.window, False)
 
+class ShardArgsInputHandler(sublime_plugin.TextInputHandler):
+  def placeholder(self):
+    return 'Files or globs to split into shards'
+
+class SharedArgsInputHandler(sublime_plugin.TextInputHandler):
+  def name(self):
+    return 'args'
+
+  def placeholder(self):
+    return 'Arguments passed to every shard'
+
+  def next_input(self, args):
+    if "shard_args" not in args:
+      return ShardArgsInputHandler()
+
+class SelectShardedExecutableInputHandler(SelectExecutableInputHandler):
+  def name(self):
+    return 'select_executable'
+
+  def next_input(self, args):
+    if "args" not in args:
+      return SharedArgsInputHandler()
+
+class ExecutorExecuteShardedCommand(sublime_plugin.WindowCommand):
+  def run(self, select_executable, args, shard_args, shards = None):
+    if select_executable:
+      if not shards:
+        settings = self.window.active_view().settings()
+        shards = settings.get("executor_shards", 0) or os.cpu_count() or 1
+      run_command(self.window, "executor_impl", {"select_executable": select_executable, "args": args, "shard_args": shard_args, "shards": shards})
+
+  def input(self, args):
+    return SelectShardedExecutableInputHandler(self.window, True)
+
 class SelectRecentInputHandler(sublime_plugin.ListInputHandler):
   def placeholder(self):
     return 'Select executable to run'
@@ -781,9 +1592,25 @@ class ExecutorCancelCommand(sublime_plugin.WindowCommand):
 class ExecutorClearOutputImplCommand(sublime_plugin.TextCommand):
   def run(self, edit):
     state = get_state(self.view.window())
-    state.command.hide_annotations()
+    if state.command:
+      state.command.hide_annotations()
+    state.errors.clear()
+    state.lines.clear()
+    for filter in state.filters:
+      with filter.lock:
+        filter.clear()
+        filter.output_view = self.view
+        if filter.view.is_valid():
+          filter.view.run_command("executor_clear_filter_impl")
+    self.view.erase_phantoms("executor_timestamp")
     self.view.erase(edit, sublime.Region(0, self.view.size()))
 
+class ExecutorClearFilterImplCommand(sublime_plugin.TextCommand):
+  def run(self, edit):
+    self.view.set_read_only(False)
+    self.view.erase(edit, sublime.Region(0, self.view.size()))
+    self.view.set_read_only(True)
+
 class ExecutorClearOutputCommand(sublime_plugin.WindowCommand):
   def run(self):
     state = get_state(self.window)
@@ -793,6 +1620,164 @@ class ExecutorClearOutputCommand(sublime_plugin.WindowCommand):
     state = get_state(self.window)
     return bool(state.output_view)
 
+class SelectArchivedRunInputHandler(sublime_plugin.ListInputHandler):
+  def __init__(self, arg_name, runs):
+    self.arg_name = arg_name
+    self.runs = runs
+
+  def name(self):
+    return self.arg_name
+
+  def placeholder(self):
+    return 'Select old run' if self.arg_name == "old" else 'Select new run'
+
+  def list_items(self):
+    items = []
+    for run in self.runs:
+      when = time.strftime("%b %d %H:%M:%S", time.localtime(run["start"]))
+      items.append(sublime.ListInputItem(run["name"], run, annotation = "%s %s" % (run.get("status") or "", when)))
+    return items or [("No archived runs", False)]
+
+  def next_input(self, args):
+    if "new" not in args:
+      return SelectArchivedRunInputHandler("new", [run for run in self.runs if run != args.get("old")])
+
+class ExecutorDiffRunsCommand(sublime_plugin.WindowCommand):
+  def run(self, old, new):
+    if not old or not new:
+      return
+    touch_archived_run(old)
+    touch_archived_run(new)
+    view = self.window.new_file()
+    view.set_scratch(True)
+    view.set_name("Diff: %s" % new["name"])
+    view.assign_syntax("Packages/Diff/Diff.sublime-syntax")
+
+    def diff():
+      chunk = []
+      chunk_size = 0
+      for line in diff_archived_runs(old, new):
+        chunk.append(line)
+        chunk_size += len(line)
+        if chunk_size >= 2 ** 16:
+          view.run_command('append', {'characters': "".join(chunk), 'force': True})
+          chunk = []
+          chunk_size = 0
+      if chunk:
+        view.run_command('append', {'characters': "".join(chunk), 'force': True})
+    sublime.set_timeout_async(diff)
+
+  def input(self, args):
+    return SelectArchivedRunInputHandler("old", archived_runs())
+
+  def is_enabled(self):
+    return os.path.isdir(archive_dir())
+
+class ExecutorNextErrorCommand(sublime_plugin.WindowCommand):
+  def run(self):
+    if err := get_state(self.window).errors.step(1):
+      goto_error(self.window, err)
+
+  def is_enabled(self):
+    return bool(get_state(self.window).errors.errors)
+
+class ExecutorPrevErrorCommand(sublime_plugin.WindowCommand):
+  def run(self):
+    if err := get_state(self.window).errors.step(-1):
+      goto_error(self.window, err)
+
+  def is_enabled(self):
+    return bool(get_state(self.window).errors.errors)
+
+class ExecutorShowErrorsCommand(sublime_plugin.WindowCommand):
+  def run(self):
+    window = self.window
+    errors = get_state(window).errors
+    order = []
+    items = []
+    for file, indices in list(errors.by_file.items()):
+      try:
+        name = os.path.relpath(file, errors.base_dir) if errors.base_dir else file
+      except ValueError:
+        name = file
+      for n, i in enumerate(indices):
+        err = errors.errors[i]
+        order.append(i)
+        items.append(sublime.QuickPanelItem("%s:%d:%d" % (name, err.line, err.col),
+                                            details = html.escape(err.message, quote = False),
+                                            annotation = "%d/%d" % (n + 1, len(indices))))
+
+    def on_select(idx):
+      if idx >= 0:
+        errors.current = order[idx]
+        goto_error(window, errors.errors[order[idx]])
+
+    def on_highlight(idx):
+      goto_error(window, errors.errors[order[idx]], sublime.TRANSIENT)
+
+    selected = order.index(errors.current) if errors.current in order else 0
+    window.show_quick_panel(items, on_select, selected_index = selected, on_highlight = on_highlight, placeholder = "%d errors in %d files" % (len(order), len(errors.by_file)))
+
+  def is_enabled(self):
+    return bool(get_state(self.window).errors.errors)
+
+class RegexInputHandler(sublime_plugin.TextInputHandler):
+  def validate(self, text):
+    try:
+      re.compile(text)
+      return True
+    except re.error:
+      return False
+
+class IncludeInputHandler(RegexInputHandler):
+  def placeholder(self):
+    return 'Show lines matching regex'
+
+  def next_input(self, args):
+    if "exclude" not in args:
+      return ExcludeInputHandler()
+
+class ExcludeInputHandler(RegexInputHandler):
+  def placeholder(self):
+    return 'Hide lines matching regex (optional)'
+
+class ExecutorFilterOutputCommand(sublime_plugin.WindowCommand):
+  def run(self, include, exclude = ""):
+    window = self.window
+    state = get_state(window)
+    for regex in (include, exclude):
+      try:
+        re.compile(regex)
+      except re.error as e:
+        print("[ Executor ] Invalid regex %s: %s" % (regex, e))
+        return
+    view = window.new_file()
+    view.set_scratch(True)
+    # Rows must stay in sync with filter offsets
+    view.set_read_only(True)
+    name = "Filter:"
+    if include:
+      name += " " + include
+    if exclude:
+      name += " -" + exclude
+    view.set_name(name)
+    settings = view.settings()
+    settings.set("executor_filter", True)
+    settings.set("word_wrap", state.output_view.settings().get("word_wrap"))
+    settings.set("scroll_past_end", False)
+    filter = OutputFilter(view, state.output_view, include, exclude)
+    with filter.lock:
+      state.filters.append(filter)
+      filter.scan(state.lines)
+
+  def input(self, args):
+    if "include" not in args:
+      return IncludeInputHandler()
+
+  def is_enabled(self):
+    state = get_state(self.window)
+    return bool(state.output_view) and state.output_view.is_valid()
+
 class ExecutorToggleBottomGroupCommand(sublime_plugin.WindowCommand):
   def run(self, visible = None):
     window = self.window